@@ -1,14 +1,28 @@
 from flask import Flask, render_template, request, jsonify
 import os
+import bisect
+import hashlib
+import sqlite3
+import threading
+import uuid
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from collections import OrderedDict
 import fitz
 from docx import Document
+from pdf_extract import EXTRACTION_WORKERS, extract_page_range, get_extraction_pool, reset_extraction_pool
 import re
+import numpy as np
 import chromadb
+import faiss
 import google.generativeai as genai
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads/'
+app.config['EMBEDDING_CACHE_PATH'] = 'embedding_cache.db'
 
 # Create directories if they don't exist
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -16,128 +30,408 @@ if not os.path.exists(app.config['UPLOAD_FOLDER']):
 
 # Configure Gemini API with the key from your environment variable
 genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+EMBEDDING_MODEL = "models/embedding-001"
+# Gemini caps the number of contents per embedding request
+EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_MAX_WORKERS = 8
+
+# Shared generation model and prompt, built once rather than per request
+_GEN_MODEL = genai.GenerativeModel('gemini-1.5-flash')
+_PROMPT_TEMPLATE = (
+    "You are a helpful assistant. Answer the user's question based on the provided context only. "
+    "If the answer is not in the context, say 'I cannot find the answer in the provided document.'\n\n"
+    "Context: {context}\n\n"
+    "Question: {query}"
+)
 
 # Initialize ChromaDB client and collection
 chroma_client = chromadb.Client()
-collection = chroma_client.get_or_create_collection(name="document_chunks")
+COLLECTION_NAME = "document_chunks"
+# Vectors are L2-normalized before storage, so inner product equals cosine
+COLLECTION_METADATA = {"hnsw:space": "ip"}
+collection = chroma_client.get_or_create_collection(name=COLLECTION_NAME, metadata=COLLECTION_METADATA)
+# Serializes writes to the collection and FAISS indices across request threads
+_COLLECTION_LOCK = threading.Lock()
+# Bumped by /clear; background uploads started before a clear must not store
+_ingest_generation = 0
+
+# One FAISS index per document holding int8 scalar-quantized vectors, each
+# trained on its own document's per-dimension min/max. Query-time search runs
+# over these and reranks the top candidates with the full float32 vectors
+# from Chroma, which stays the store of record for chunks and embeddings.
+FAISS_FLAT_MAX_VECTORS = 100_000
+RERANK_FACTOR = 4
+faiss_indices = []  # (index, chunk ids by position)
+faiss_ids = set()
+
+# Ring buffer of recent (normalized query vector, k, retrieved chunks). A query
+# whose vector is within RETRIEVAL_CACHE_THRESHOLD cosine similarity of a
+# cached one reuses its chunks. Emptied whenever the indexed documents change.
+RETRIEVAL_CACHE_SIZE = 256
+RETRIEVAL_CACHE_THRESHOLD = 0.97
+_retrieval_cache_vectors = None
+_retrieval_cache_entries = []
+_retrieval_cache_next = 0
+_retrieval_cache_generation = 0
+_RETRIEVAL_CACHE_LOCK = threading.Lock()
+
+# Background ingestion of uploaded files, with job status keyed by job id
+# Finished jobs stay readable until more than MAX_FINISHED_JOBS newer ones
+# have finished, so _JOBS stays bounded.
+_JOBS = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+MAX_FINISHED_JOBS = 100
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Precompiled patterns used during preprocessing and chunking
+_NEWLINES_RE = re.compile(r'\n+')
+# A sentence runs from the first non-space character up to the first
+# [.!?] followed by whitespace, or to the end of the text. The lazy scan
+# stops at the first boundary and the fallback branch takes the remainder,
+# so matching stays linear even on text with no punctuation.
+_SENT_RE = re.compile(r'(?s)([.!?]|\S.*?[.!?])(?:\s|$)|(\S.*)')
+_SENT_END_RE = re.compile(r'[.!?]')
+
+# Very large inputs with no sentence punctuation near the start are split
+# into fixed-size windows instead of sentences.
+SENTENCE_SCAN_MAX_CHARS = 1_000_000
+SENTENCE_PROBE_CHARS = 4096
+
+# Chunk size by preprocessed text length: below 2000 chars use 1000,
+# below 10000 use 700, otherwise 400.
+CHUNK_SIZE_THRESHOLDS = [2000, 10000]
+CHUNK_SIZES = [1000, 700, 400]
+CHUNK_OVERLAP_RATIO = 0.15
+
+# Persistent cache of document embeddings keyed by SHA-256 of the chunk text,
+# so re-uploading a document does not re-embed chunks we have already seen.
+def _open_embedding_cache():
+    conn = sqlite3.connect(app.config['EMBEDDING_CACHE_PATH'])
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS embedding_cache ("
+        "hash TEXT, model TEXT, vector BLOB, PRIMARY KEY (hash, model))"
+    )
+    return conn
 
 # --- Helper Functions for File Processing and Embedding ---
 
+# PDFs with fewer pages than this are extracted in-process. Dense pages take
+# about 3 ms each in-process, against about 2.5 ms for a round trip through
+# the warm pool across 4 shards, so 8 pages leaves a safe margin.
+PDF_PARALLEL_MIN_PAGES = 8
+
 def extract_text_from_pdf(filepath):
-    """Extracts text from a PDF file."""
-    text = ""
+    """Extracts text from a PDF file, splitting large files across processes."""
     try:
-        doc = fitz.open(filepath)
-        for page in doc:
-            text += page.get_text()
-        doc.close()
+        with fitz.open(filepath) as doc:
+            page_count = doc.page_count
+
+        if page_count < PDF_PARALLEL_MIN_PAGES or EXTRACTION_WORKERS < 2:
+            return extract_page_range(filepath, 0, page_count)
+
+        step = -(-page_count // EXTRACTION_WORKERS)
+        shards = [(lo, min(lo + step, page_count)) for lo in range(0, page_count, step)]
+        try:
+            results = get_extraction_pool().map(
+                extract_page_range,
+                [filepath] * len(shards),
+                [lo for lo, _ in shards],
+                [hi for _, hi in shards],
+            )
+            return "".join(results)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time and finish in-process
+            reset_extraction_pool()
+            return extract_page_range(filepath, 0, page_count)
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return None
-    return text
 
 def extract_text_from_docx(filepath):
     """Extracts text from a DOCX file."""
-    text = ""
     try:
         doc = Document(filepath)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        return "\n".join(para.text for para in doc.paragraphs)
     except Exception as e:
         print(f"Error extracting text from DOCX: {e}")
         return None
-    return text
 
 def preprocess_text(text):
     """Cleans up the text by removing extra whitespace and newlines."""
-    text = re.sub(r'\n+', ' ', text)
-    text = text.strip()
-    return text
+    return _NEWLINES_RE.sub(' ', text).strip()
 
 def chunk_text_smarter(text, chunk_size, overlap):
     """
     Splits text into chunks based on sentences with dynamic size and overlap.
     """
-    chunks = []
-    current_chunk = ""
-    sentences = re.split('(?<=[.!?])\s+', text)
-
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) <= chunk_size:
-            current_chunk += sentence + " "
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + " "
-
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if len(text) > SENTENCE_SCAN_MAX_CHARS and not _SENT_END_RE.search(text, 0, SENTENCE_PROBE_CHARS):
+        chunks = [text[i:i + chunk_size].strip() for i in range(0, len(text), chunk_size)]
+        chunks = [chunk for chunk in chunks if chunk]
+    else:
+        chunks = []
+        current_buf = []
+        current_len = 0
+
+        for match in _SENT_RE.finditer(text):
+            sentence = match.group(1) or match.group(2)
+            if current_len + len(sentence) > chunk_size and current_buf:
+                chunks.append(" ".join(current_buf))
+                current_buf = []
+                current_len = 0
+            current_buf.append(sentence)
+            current_len += len(sentence) + 1
+
+        if current_buf:
+            chunks.append(" ".join(current_buf))
 
     if len(chunks) > 1 and overlap > 0:
-        overlapping_chunks = []
-        for i in range(len(chunks)):
-            start_index = max(0, i - 1)
-            combined_text = ' '.join(chunks[start_index:i+1])
-            overlapping_chunks.append(combined_text)
+        # Prefix each chunk with the last `overlap` characters of the previous
+        # one, starting at a word boundary so the tail has no partial word.
+        overlapping_chunks = [chunks[0]]
+        for i in range(1, len(chunks)):
+            previous = chunks[i - 1]
+            tail = previous[-overlap:]
+            if len(previous) > overlap and previous[-overlap - 1] != " ":
+                tail = tail.partition(" ")[2]
+            overlapping_chunks.append(f"{tail} {chunks[i]}" if tail else chunks[i])
         return overlapping_chunks
     return chunks
 
+def choose_chunk_size(text_length):
+    """Picks the chunk size for a document of the given length."""
+    return CHUNK_SIZES[bisect.bisect_right(CHUNK_SIZE_THRESHOLDS, text_length)]
+
+def process_document(raw_text):
+    """
+    Runs preprocessing and chunking as one step, returning the chunks along
+    with the preprocessed text length and the chunk size that was used.
+    """
+    text = preprocess_text(raw_text)
+    text_length = len(text)
+    chunk_size = choose_chunk_size(text_length)
+    chunks = chunk_text_smarter(text, chunk_size=chunk_size, overlap=int(chunk_size * CHUNK_OVERLAP_RATIO))
+    return chunks, text_length, chunk_size
+
+def _embed_batch(batch):
+    response = genai.embed_content(
+        model=EMBEDDING_MODEL,
+        content=batch,
+        task_type="retrieval_document"
+    )
+    return response['embedding']
+
 def get_embeddings(texts):
-    """Converts a list of texts into a list of Gemini embeddings using batching."""
+    """Converts a list of texts into a float32 array of Gemini embeddings using batching."""
     try:
-        # Gemini allows multiple contents in a single call
-        response = genai.embed_content(
-            model="models/embedding-001",
-            content=texts,
-            task_type="retrieval_document"
-        )
-        embeddings = response['embedding']
-        return embeddings
+        batches = [texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+        if len(batches) == 1:
+            return np.asarray(_embed_batch(batches[0]), dtype=np.float32)
+
+        # The calls are network-bound, so threads overlap the round-trips.
+        # executor.map yields results in batch order, preserving chunk order.
+        with ThreadPoolExecutor(max_workers=min(EMBEDDING_MAX_WORKERS, len(batches))) as executor:
+            results = executor.map(_embed_batch, batches)
+            return np.asarray(list(itertools.chain.from_iterable(results)), dtype=np.float32)
     except Exception as e:
         print(f"Error getting embeddings from Gemini API: {e}")
         return None
 
 
-def store_embeddings(chunks, filename):
-    """Converts text chunks into embeddings and stores them in ChromaDB."""
+def get_cached_embeddings(chunks):
+    """Embeds chunks, reusing vectors from the persistent cache where possible."""
+    hashes = [hashlib.sha256(chunk.encode()).hexdigest() for chunk in chunks]
+
+    conn = _open_embedding_cache()
     try:
-        embeddings = get_embeddings(chunks)
+        cached = {}
+        unique_hashes = list(set(hashes))
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embedding_cache "
+                f"WHERE model = ? AND hash IN ({placeholders})",
+                [EMBEDDING_MODEL, *batch]
+            )
+            for h, blob in rows:
+                cached[h] = np.frombuffer(blob, dtype=np.float32)
+
+        # Identical chunks (repeated headers, footers, boilerplate) share a
+        # hash, so each distinct text is embedded once and scattered back below
+        uncached_indices = []
+        seen = set()
+        for i, h in enumerate(hashes):
+            if h not in cached and h not in seen:
+                seen.add(h)
+                uncached_indices.append(i)
+        uncached_texts = [chunks[i] for i in uncached_indices]
+
+        if uncached_texts:
+            fresh = get_embeddings(uncached_texts)
+            if fresh is None:
+                return None
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO embedding_cache (hash, model, vector) VALUES (?, ?, ?)",
+                    [
+                        (hashes[i], EMBEDDING_MODEL, v.tobytes())
+                        for i, v in zip(uncached_indices, fresh)
+                    ]
+                )
+            for i, v in zip(uncached_indices, fresh):
+                cached[hashes[i]] = v
+
+        print(f"Embedding cache: {len(chunks)} chunks, {len(uncached_texts)} embedded via API.")
+        return np.stack([cached[h] for h in hashes])
+    finally:
+        conn.close()
+
+
+def normalize_embeddings(vectors):
+    """L2-normalizes a 2-D float32 array of embeddings in place and returns it."""
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    return vectors
+
+def store_embeddings(chunks, filename, generation=None):
+    """
+    Converts text chunks into embeddings and stores them in ChromaDB. When a
+    generation is given, nothing is stored if /clear has run since.
+    """
+    try:
+        embeddings = get_cached_embeddings(chunks)
         if embeddings is None:
             return False
+        normalize_embeddings(embeddings)
 
         ids = [f"{filename}_{i}" for i in range(len(chunks))]
         metadatas = [{"source": filename} for _ in range(len(chunks))]
 
-        collection.add(
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=metadatas,
-            ids=ids
-        )
+        with _COLLECTION_LOCK:
+            if generation is not None and generation != _ingest_generation:
+                print(f"Discarding embeddings for {filename}: documents were cleared during processing.")
+                return False
+            collection.add(
+                embeddings=embeddings,
+                documents=chunks,
+                metadatas=metadatas,
+                ids=ids
+            )
+            add_to_faiss_index(embeddings, ids)
+        reset_retrieval_cache()
         print(f"Successfully stored {len(chunks)} embeddings in ChromaDB.")
         return True
     except Exception as e:
         print(f"Error storing embeddings in ChromaDB: {e}")
         return False
 
+def add_to_faiss_index(embeddings, ids):
+    """Quantizes a document's normalized vectors into its own FAISS index, skipping known ids."""
+    new = [i for i, chunk_id in enumerate(ids) if chunk_id not in faiss_ids]
+    if not new:
+        return
+
+    vectors = np.ascontiguousarray(embeddings[new], dtype=np.float32)
+    dim = vectors.shape[1]
+
+    if len(new) > FAISS_FLAT_MAX_VECTORS:
+        # Past this size a flat scan gets slow; use an HNSW graph instead
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+
+    faiss_indices.append((index, [ids[i] for i in new]))
+    faiss_ids.update(ids[i] for i in new)
+
+def reset_faiss_index():
+    """Drops all FAISS indices."""
+    faiss_indices.clear()
+    faiss_ids.clear()
+
+def reset_retrieval_cache():
+    """Forgets cached retrievals; called whenever the indexed documents change."""
+    global _retrieval_cache_vectors, _retrieval_cache_next, _retrieval_cache_generation
+    with _RETRIEVAL_CACHE_LOCK:
+        _retrieval_cache_vectors = None
+        _retrieval_cache_entries.clear()
+        _retrieval_cache_next = 0
+        _retrieval_cache_generation += 1
+
+def _lookup_retrieval_cache(query_vector, k):
+    """Returns cached chunks for a near-duplicate query, or None."""
+    with _RETRIEVAL_CACHE_LOCK:
+        if not _retrieval_cache_entries:
+            return None
+        similarities = _retrieval_cache_vectors[:len(_retrieval_cache_entries)] @ query_vector
+        best = int(np.argmax(similarities))
+        cached_k, chunks = _retrieval_cache_entries[best]
+        if similarities[best] >= RETRIEVAL_CACHE_THRESHOLD and cached_k == k:
+            return chunks
+        return None
+
+def _store_retrieval_cache(query_vector, k, chunks, generation):
+    """Records a retrieval unless the documents changed since it started."""
+    global _retrieval_cache_vectors, _retrieval_cache_next
+    with _RETRIEVAL_CACHE_LOCK:
+        if generation != _retrieval_cache_generation:
+            return
+        if _retrieval_cache_vectors is None:
+            _retrieval_cache_vectors = np.zeros((RETRIEVAL_CACHE_SIZE, len(query_vector)), dtype=np.float32)
+        slot = _retrieval_cache_next
+        _retrieval_cache_vectors[slot] = query_vector
+        if slot < len(_retrieval_cache_entries):
+            _retrieval_cache_entries[slot] = (k, chunks)
+        else:
+            _retrieval_cache_entries.append((k, chunks))
+        _retrieval_cache_next = (slot + 1) % RETRIEVAL_CACHE_SIZE
+
 #  Helper Functions for Querying and LLM Response 
 
+@lru_cache(maxsize=1024)
+def _embed_query(query):
+    """Embeds a user query; repeated queries are served from memory."""
+    response = genai.embed_content(
+        model=EMBEDDING_MODEL,
+        content=query,
+        task_type="retrieval_query"
+    )
+    return tuple(response['embedding'])
+
 def get_most_relevant_chunks(query, k=5):
 
     try:
-        query_embedding = genai.embed_content(
-            model="models/embedding-001",
-            content=query,
-            task_type="retrieval_query"
-        )
-        query_vector = query_embedding['embedding']
-        
-        results = collection.query(
-            query_embeddings=[query_vector],
-            n_results=k
-        )
+        if not faiss_indices:
+            return []
+
+        generation = _retrieval_cache_generation
+        query_vector = np.array([_embed_query(query)], dtype=np.float32)
+        normalize_embeddings(query_vector)
+
+        cached = _lookup_retrieval_cache(query_vector[0], k)
+        if cached is not None:
+            return list(cached)
         
-        return results['documents'][0]
+        # Stage 1: approximate scores from the int8 codes
+        num_candidates = k * RERANK_FACTOR
+        candidates = []
+        for index, chunk_ids in faiss_indices:
+            scores, positions = index.search(query_vector, min(num_candidates, index.ntotal))
+            candidates.extend((score, chunk_ids[p]) for score, p in zip(scores[0], positions[0]) if p != -1)
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        candidate_ids = [chunk_id for _, chunk_id in candidates[:num_candidates]]
+        if not candidate_ids:
+            return []
+
+        # Stage 2: exact rerank with the float32 vectors stored in Chroma
+        stored = collection.get(ids=candidate_ids, include=["embeddings", "documents"])
+        exact_scores = np.asarray(stored['embeddings'], dtype=np.float32) @ query_vector[0]
+        top = np.argsort(-exact_scores)[:k]
+        chunks = [stored['documents'][i] for i in top]
+
+        _store_retrieval_cache(query_vector[0], k, tuple(chunks), generation)
+        return chunks
     except Exception as e:
         print(f"Error during semantic search: {e}")
         return []
@@ -145,15 +439,9 @@ def get_most_relevant_chunks(query, k=5):
 def generate_llm_response(query, context):
   
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = (
-            f"You are a helpful assistant. Answer the user's question based on the provided context only. "
-            f"If the answer is not in the context, say 'I cannot find the answer in the provided document.'\n\n"
-            f"Context: {context}\n\n"
-            f"Question: {query}"
-        )
+        prompt = _PROMPT_TEMPLATE.format(context=context, query=query)
         
-        response = model.generate_content(prompt)
+        response = _GEN_MODEL.generate_content(prompt)
         return response.text
     except Exception as e:
         print(f"Error generating LLM response: {e}")
@@ -165,50 +453,45 @@ def generate_llm_response(query, context):
 def index():
     return render_template('index.html')
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    
-    extracted_text = None
-    
-    if file:
-        filename = file.filename
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        file_extension = os.path.splitext(filename)[1].lower()
+def _finish_job(job_id, result):
+    """Records a job's final state, evicting the oldest finished jobs."""
+    with _JOBS_LOCK:
+        _JOBS[job_id] = result
+        _JOBS.move_to_end(job_id)
+        finished = [jid for jid, job in _JOBS.items() if job['status'] != 'processing']
+        for jid in finished[:-MAX_FINISHED_JOBS]:
+            del _JOBS[jid]
 
+def _cancel_job(job_id):
+    _finish_job(job_id, {'status': 'cancelled', 'error': 'Upload cancelled because the documents were cleared.'})
+
+def _ingest(file_path, filename, file_extension, job_id, generation):
+    """Extracts, chunks and embeds an uploaded file, recording progress in _JOBS."""
+    try:
         if file_extension == '.pdf':
             extracted_text = extract_text_from_pdf(file_path)
-        elif file_extension == '.docx':
-            extracted_text = extract_text_from_docx(file_path)
         else:
-            return jsonify({'error': 'Unsupported file type. Please upload a .pdf or .docx'}), 400
+            extracted_text = extract_text_from_docx(file_path)
 
-    if extracted_text:
-        preprocessed_text = preprocess_text(extracted_text)
-        text_length = len(preprocessed_text)
-        
-        if text_length < 2000:
-            dynamic_chunk_size = 1000
-        elif text_length < 10000:
-            dynamic_chunk_size = 700
-        else:
-            dynamic_chunk_size = 400
+        if generation != _ingest_generation:
+            _cancel_job(job_id)
+            return
 
-        dynamic_overlap = int(dynamic_chunk_size * 0.15)
-        
-        chunks = chunk_text_smarter(preprocessed_text, chunk_size=dynamic_chunk_size, overlap=dynamic_overlap)
+        if not extracted_text:
+            _finish_job(job_id, {'status': 'error', 'error': 'Failed to extract text from the document.'})
+            return
+
+        chunks, text_length, dynamic_chunk_size = process_document(extracted_text)
+        # Drop the raw text before the embedding round-trips
+        extracted_text = None
         
-        success = store_embeddings(chunks, filename)
+        success = store_embeddings(chunks, filename, generation)
+        if not success and generation != _ingest_generation:
+            _cancel_job(job_id)
+            return
         if not success:
-            return jsonify({'error': 'Failed to create and store vector embeddings.'}), 500
+            _finish_job(job_id, {'status': 'error', 'error': 'Failed to create and store vector embeddings.'})
+            return
 
         print(f"Total text length: {text_length} characters")
         print(f"Dynamic chunk size: {dynamic_chunk_size}")
@@ -224,9 +507,48 @@ def upload_file():
             print(chunks[-1])
             print("------------------")
             
-        return jsonify({'message': f'File "{filename}" uploaded, text processed, and embeddings stored successfully!'}), 200
-    else:
-        return jsonify({'error': 'Failed to extract text from the document.'}), 500
+        _finish_job(job_id, {'status': 'done', 'message': f'File "{filename}" uploaded, text processed, and embeddings stored successfully!'})
+    except Exception as e:
+        print(f"Error processing upload {filename}: {e}")
+        _finish_job(job_id, {'status': 'error', 'error': 'Failed to process the document.'})
+
+@app.route('/upload', methods=['POST'])
+def upload_file():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    
+    filename = file.filename
+    file_extension = os.path.splitext(filename)[1].lower()
+
+    if file_extension not in ('.pdf', '.docx'):
+        return jsonify({'error': 'Unsupported file type. Please upload a .pdf or .docx'}), 400
+
+    # Captured before saving, so a /clear from here on cancels this upload
+    generation = _ingest_generation
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(file_path)
+
+    # Extraction and embedding run in the background; the client polls
+    # /upload/status/<job_id> for the result.
+    job_id = uuid.uuid4().hex
+    with _JOBS_LOCK:
+        _JOBS[job_id] = {'status': 'processing'}
+    _EXECUTOR.submit(_ingest, file_path, filename, file_extension, job_id, generation)
+
+    return jsonify({'job_id': job_id, 'message': f'File "{filename}" uploaded, processing...'}), 202
+
+@app.route('/upload/status/<job_id>')
+def upload_status(job_id):
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify(job), 200
 
 @app.route('/query', methods=['POST'])
 def handle_query():
@@ -248,17 +570,24 @@ def handle_query():
 
 @app.route('/clear', methods=['POST'])
 def clear_document():
+    global collection, _ingest_generation
     try:
        
-        files = os.listdir(app.config['UPLOAD_FOLDER'])
+        with os.scandir(app.config['UPLOAD_FOLDER']) as entries:
+            paths = [entry.path for entry in entries if entry.is_file()]
         
       
-        for file in files:
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], file)
-            os.remove(file_path)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(os.unlink, paths))
             
        
-        collection.delete(ids=collection.get()['ids'])
+        # Dropping the collection avoids pulling every id into Python
+        with _COLLECTION_LOCK:
+            _ingest_generation += 1
+            chroma_client.delete_collection(name=COLLECTION_NAME)
+            collection = chroma_client.get_or_create_collection(name=COLLECTION_NAME, metadata=COLLECTION_METADATA)
+            reset_faiss_index()
+        reset_retrieval_cache()
         
         return jsonify({'message': 'Document and embeddings cleared successfully! You can now upload a new document.'}), 200
     except Exception as e:
@@ -266,4 +595,5 @@ def clear_document():
         return jsonify({'error': 'Failed to clear the document.'}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; production runs under gunicorn (see Procfile)
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
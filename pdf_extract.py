@@ -0,0 +1,57 @@
+"""
+PDF text extraction that runs in worker processes. This module imports only
+fitz, so when the app is served by gunicorn the extraction workers start
+without app.py's Flask, ChromaDB and Gemini setup.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+
+# Plain-text extraction flags: the defaults minus ligature and whitespace
+# preservation, so ligatures expand to letters and whitespace becomes spaces.
+PDF_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_CID_FOR_UNKNOWN_UNICODE
+
+# Workers are started from a forkserver (or spawned where that is not
+# available) rather than forked from the app process, whose gRPC and request
+# threads make a plain fork unsafe.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    mp_context = multiprocessing.get_context("forkserver")
+    # Preload this module (and so fitz) in the server once. This does not
+    # stop children from importing the caller's __main__: started as
+    # `python app.py`, each worker still imports app.py as __mp_main__, which
+    # is why the pool is built once and reused rather than per call.
+    mp_context.set_forkserver_preload([__name__])
+else:
+    mp_context = multiprocessing.get_context("spawn")
+
+EXTRACTION_WORKERS = min(os.cpu_count() or 1, 4)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_extraction_pool():
+    """Returns the shared extraction pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=mp_context)
+        return _pool
+
+def reset_extraction_pool():
+    """Discards a broken pool so the next call starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def extract_page_range(filepath, lo, hi):
+    """Extracts text from pages [lo, hi) of a PDF file."""
+    # Each worker opens its own Document; MuPDF handles are not fork-safe.
+    doc = fitz.open(filepath)
+    try:
+        return "".join(doc[i].get_text("text", flags=PDF_TEXT_FLAGS, sort=False) for i in range(lo, hi))
+    finally:
+        doc.close()
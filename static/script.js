@@ -89,6 +89,29 @@ document.addEventListener("DOMContentLoaded", () => {
         if (data.error) {
           statusMessage.textContent = `Error: ${data.error}`;
           statusMessage.style.color = "red";
+        } else {
+          statusMessage.textContent = data.message;
+          statusMessage.style.color = "black";
+          pollUploadStatus(data.job_id);
+        }
+      })
+      .catch((error) => {
+        statusMessage.textContent = "An error occurred during the upload.";
+        statusMessage.style.color = "red";
+        console.error("Error:", error);
+      });
+  }
+
+  // The server processes uploads in the background; poll until it finishes
+  function pollUploadStatus(jobId) {
+    fetch(`/upload/status/${jobId}`)
+      .then((response) => response.json())
+      .then((data) => {
+        if (data.status === "processing") {
+          setTimeout(() => pollUploadStatus(jobId), 1000);
+        } else if (data.error) {
+          statusMessage.textContent = `Error: ${data.error}`;
+          statusMessage.style.color = "red";
         } else {
           statusMessage.textContent = data.message;
           statusMessage.style.color = "green";